@@ -9,6 +9,11 @@ from src.utils.session import Session
 
 numpy.random.seed(2)
 torch.manual_seed(2)
+torch.cuda.manual_seed_all(2)
+
+torch.backends.cudnn.benchmark = True
+torch.backends.cuda.matmul.allow_tf32 = True
+torch.backends.cudnn.allow_tf32 = True
 
 EXPERIMENT_CONFIG = 'configs/experiments/unmt.json'
 
@@ -9,7 +9,6 @@ import torch.nn as nn
 import torch.nn.functional as functional
 
 from src.components.base import Decoder
-from src.components.utils.utils import Optimizer
 
 from src.utils.analysis import AttentionData
 
@@ -54,7 +53,6 @@ class RNNDecoder(Decoder):
         self._parameter_setter = parameter_setter
 
         self._recurrent_layer = None
-        self._optimizer = None
         self._tokens = None
 
         self._outputs = {
@@ -97,18 +95,6 @@ class RNNDecoder(Decoder):
 
         return self
 
-    def init_optimizer(self) -> Decoder:
-        """
-        Initializes the optimizer for the decoder.
-        """
-        parameters = [param for name, param in self.named_parameters() if name in self._recurrent_parameters]
-        self._optimizer = Optimizer(parameters=parameters,
-                                    optimizer_type=self._optimizer_type,
-                                    scheduler_type='ReduceLROnPlateau',
-                                    learning_rate=self._learning_rate)
-
-        return self
-
     def _decode(self,
                 inputs:             torch.autograd.Variable,
                 hidden_state:       torch.autograd.Variable,
@@ -328,20 +314,26 @@ class RNNDecoder(Decoder):
         return {}
 
     @property
-    def optimizers(self) -> list:
+    def optimizer_type(self) -> str:
         """
-        Property for the optimizers of the decoder.
+        Property for the optimizer type of the decoder.
         """
-        return [self._optimizer]
+        return self._optimizer_type
+
+    @property
+    def learning_rate(self) -> float:
+        """
+        Property for the learning rate of the decoder.
+        """
+        return self._learning_rate
 
     @property
     def state(self) -> dict:
         """
-        Property for the optimizers of the decoder.
+        Property for the state of the decoder.
         """
         return {
-            'weights':      {k: v for k, v in self.state_dict().items() if k in self._recurrent_parameters},
-            'optimizer':    self._optimizer.state
+            'weights': {k: v for k, v in self.state_dict().items() if k in self._recurrent_parameters}
         }
 
     @state.setter
@@ -351,7 +343,6 @@ class RNNDecoder(Decoder):
         """
         parameters = {k: v for k, v in state['weights'].items() if k in self._recurrent_parameters}
         self.load_state_dict(parameters, strict=False)
-        self._optimizer.state = state['optimizer']
 
 
 class AttentionRNNDecoder(RNNDecoder):
@@ -373,21 +364,6 @@ class AttentionRNNDecoder(RNNDecoder):
         }
 
         self._attention_parameters = None
-        self._attention_optimizer = None
-
-    def init_optimizer(self) -> Decoder:
-        """
-        Initializes the optimizer for the decoder.
-        """
-        super().init_optimizer()
-
-        parameters = [param for name, param in self.named_parameters() if name in self._attention_parameters]
-        self._attention_optimizer = Optimizer(parameters=parameters,
-                                              optimizer_type=self._optimizer_type,
-                                              scheduler_type='ReduceLROnPlateau',
-                                              learning_rate=self._learning_rate)
-
-        return self
 
     def _calculate_context(self,
                            decoder_state:       torch.autograd.Variable,
@@ -607,23 +583,14 @@ class AttentionRNNDecoder(RNNDecoder):
             'attention': AttentionData
         }
 
-    @property
-    def optimizers(self) -> list:
-        return [
-            self._optimizer,
-            self._attention_optimizer
-        ]
-
     @property
     def state(self) -> dict:
         """
-        Property for the optimizers of the decoder.
+        Property for the state of the decoder.
         """
         return {
             'weights':              {k: v for k, v in self.state_dict().items()
-                                     if k in self._recurrent_parameters or k in self._attention_parameters},
-            'optimizer':            self._optimizer.state,
-            'attention_optimizer':  self._attention_optimizer.state
+                                     if k in self._recurrent_parameters or k in self._attention_parameters}
         }
 
     @state.setter
@@ -634,8 +601,6 @@ class AttentionRNNDecoder(RNNDecoder):
         parameters = {k: v for k, v in state['weights'].items()
                       if k in self._recurrent_parameters or k in self._attention_parameters}
         self.load_state_dict(parameters, strict=False)
-        self._optimizer.state = state['optimizer']
-        self._attention_optimizer.state = state['attention_optimizer']
 
 
 class BahdanauAttentionRNNDecoder(AttentionRNNDecoder):
@@ -3,19 +3,71 @@
 """
 
 import torch
-import torch.autograd as autograd
 import torch.nn
 import torch.optim
 
-from torch.nn.utils.rnn import pack_padded_sequence, pad_packed_sequence
+from torch.nn.utils.rnn import PackedSequence, pack_padded_sequence, pad_packed_sequence
 
 from src.components.base import Encoder
-from src.components.utils.utils import Optimizer
 
 from src.utils.analysis import LatentStateData
 
 from src.utils.utils import ParameterSetter, Interface
 
+from typing import Optional, Tuple
+
+
+class _GRUCore(torch.nn.Module):
+    """
+    TorchScript-compiled core of the recurrent encoder. The rnn -> pad sequence
+    of the forward pass is fused into a single graph, which removes the Python
+    dispatch overhead between the embedding lookup and the cuDNN call. The
+    inputs arrive as the already packed and embedded components of a
+    PackedSequence, so the recurrent layer only processes the valid tokens.
+    """
+
+    def __init__(self, recurrent_layer):
+        super().__init__()
+        self._recurrent_layer = recurrent_layer
+
+    def forward(self,
+                embedded_data:      torch.Tensor,
+                batch_sizes:        torch.Tensor,
+                sorted_indices:     Optional[torch.Tensor],
+                unsorted_indices:   Optional[torch.Tensor],
+                initial_state:      torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        padded_sequence = PackedSequence(embedded_data, batch_sizes,
+                                         sorted_indices, unsorted_indices)
+        outputs, hidden_state = self._recurrent_layer(padded_sequence, initial_state)
+        outputs, _ = pad_packed_sequence(outputs, batch_first=True)
+
+        return outputs, hidden_state
+
+
+class _LSTMCore(torch.nn.Module):
+    """
+    TorchScript-compiled core of the recurrent encoder, specialized for the LSTM
+    unit type, where the hidden state is a (hidden, cell) tuple.
+    """
+
+    def __init__(self, recurrent_layer):
+        super().__init__()
+        self._recurrent_layer = recurrent_layer
+
+    def forward(self,
+                embedded_data:      torch.Tensor,
+                batch_sizes:        torch.Tensor,
+                sorted_indices:     Optional[torch.Tensor],
+                unsorted_indices:   Optional[torch.Tensor],
+                initial_state:      Tuple[torch.Tensor, torch.Tensor]) \
+            -> Tuple[torch.Tensor, Tuple[torch.Tensor, torch.Tensor]]:
+        padded_sequence = PackedSequence(embedded_data, batch_sizes,
+                                         sorted_indices, unsorted_indices)
+        outputs, hidden_state = self._recurrent_layer(padded_sequence, initial_state)
+        outputs, _ = pad_packed_sequence(outputs, batch_first=True)
+
+        return outputs, hidden_state
+
 
 class RNNEncoder(Encoder):
     """
@@ -50,7 +102,7 @@ class RNNEncoder(Encoder):
         self._parameter_setter = parameter_setter
 
         self._recurrent_layer = None
-        self._optimizer = None
+        self._recurrent_core = None
 
         self._outputs = {
             'encoder_outputs':   None,
@@ -59,23 +111,88 @@ class RNNEncoder(Encoder):
 
         self.embedding = None
         self._recurrent_parameters = None
+        self._hidden_buffer = None
+        self._device = None
 
     def forward(self, *args, **kwargs):
         raise NotImplementedError
 
-    def init_optimizer(self):
+    def _init_hidden(self, batch_size):
+        raise NotImplementedError
+
+    def _warmup(self, passes=3):
         """
-        Initializes the optimizer for the encoder.
+        Runs a few throwaway forward passes through the scripted core with a dummy
+        batch of a representative shape. The first calls of a TorchScript graph
+        trigger its profiling and optimization passes, which are orders of
+        magnitude slower than steady state; executing them here keeps that stall
+        out of the timed training loop.
+
+        :param passes:
+            int, number of warmup passes to execute.
         """
-        self._optimizer = Optimizer(parameters=self.parameters(),
-                                    optimizer_type=self._optimizer_type,
-                                    scheduler_type='ReduceLROnPlateau',
-                                    learning_rate=self._learning_rate)
+        batch_size, sequence_length = 32, 20
 
-        return self
+        dummy_inputs = torch.zeros(batch_size, sequence_length,
+                                   dtype=torch.int64, device=self._device)
+        lengths = torch.full((batch_size,), sequence_length, dtype=torch.int64)
 
-    def _init_hidden(self, batch_size):
-        raise NotImplementedError
+        packed_inputs = self._pack_inputs(dummy_inputs, lengths)
+        embedded_data = torch.zeros(packed_inputs.data.size(0), self._embedding_size,
+                                    device=self._device)
+        initial_state = self._init_hidden(batch_size)
+
+        with torch.no_grad():
+            for _ in range(passes):
+                self._recurrent_core(embedded_data, packed_inputs.batch_sizes,
+                                     packed_inputs.sorted_indices,
+                                     packed_inputs.unsorted_indices, initial_state)
+
+    @staticmethod
+    def _pack_inputs(inputs, lengths):
+        """
+        Packs the batch of word ids before the embedding lookup. Embedding the
+        packed data tensor instead of the full padded batch skips the lookups
+        on the padding positions, which would otherwise be discarded anyway.
+
+        :param inputs:
+            Variable, (batch_size, sequence_length) containing the ids of the words.
+
+        :param lengths:
+            Ndarray, containing the real lengths of the sequences in the batch.
+
+        :return:
+            PackedSequence, containing the word ids of the valid positions.
+        """
+        lengths = torch.as_tensor(lengths, dtype=torch.int64)
+
+        return pack_padded_sequence(inputs, lengths, batch_first=True,
+                                    enforce_sorted=False)
+
+    def _hidden_state_slice(self, num_states, batch_size):
+        """
+        Provides a zero initial hidden state from a persistent buffer, that is only
+        reallocated, when the required size exceeds the size of the stored tensor.
+        Reusing the buffer avoids a fresh allocation - and a host to device copy in
+        case of cuda - on every forward pass of the encoder.
+
+        :param num_states:
+            int, num_layers * directions of the recurrent layer.
+
+        :param batch_size:
+            int, size of the currently processed batch.
+
+        :return:
+            Tensor, (num_states, batch_size, hidden_size) filled with zeros.
+        """
+        if self._hidden_buffer is None or \
+                self._hidden_buffer.size(0) != num_states or \
+                self._hidden_buffer.size(1) < batch_size:
+
+            self._hidden_buffer = torch.zeros(num_states, batch_size, self._hidden_size,
+                                              device=self._device)
+
+        return self._hidden_buffer[:, :batch_size].contiguous()
 
     @property
     def output_types(self):
@@ -84,11 +201,18 @@ class RNNEncoder(Encoder):
         }
 
     @property
-    def optimizers(self):
+    def optimizer_type(self):
         """
-        Property for the optimizers of the encoder.
+        Property for the optimizer type of the encoder.
         """
-        return [self._optimizer]
+        return self._optimizer_type
+
+    @property
+    def learning_rate(self):
+        """
+        Property for the learning rate of the encoder.
+        """
+        return self._learning_rate
 
     @property
     def state(self):
@@ -96,20 +220,19 @@ class RNNEncoder(Encoder):
         Property for the state of the encoder.
         """
         return {
-            'weights':      {k: v for k, v in self.state_dict().items() if k in self._recurrent_parameters},
-            'optimizer':    self._optimizer.state
+            'weights': {k: v for k, v in self.state_dict().items() if k in self._recurrent_parameters}
         }
 
     # noinspection PyMethodOverriding
     @state.setter
     def state(self, state):
         """
-        Setter method for the weights of the encoder, and the optimizer.
+        Setter method for the weights of the encoder.
         :param state: dict, containing the states.
         """
         parameters = {k: v for k, v in state['weights'].items() if k in self._recurrent_parameters}
         self.load_state_dict(parameters, strict=False)
-        self._optimizer.state = state['optimizer']
+        self._recurrent_layer.flatten_parameters()
 
 
 class UnidirectionalRNNEncoder(RNNEncoder):
@@ -133,6 +256,8 @@ class UnidirectionalRNNEncoder(RNNEncoder):
         """
         self._parameter_setter.initialize(self)
 
+        self._device = torch.device('cuda' if self._cuda else 'cpu')
+
         if self._recurrent_type == 'LSTM':
             unit_type = torch.nn.LSTM
         elif self._recurrent_type == 'GRU':
@@ -150,8 +275,15 @@ class UnidirectionalRNNEncoder(RNNEncoder):
         if self._cuda:
             self._recurrent_layer = self._recurrent_layer.cuda()
 
+        self._recurrent_layer.flatten_parameters()
+
+        core_type = _LSTMCore if self._recurrent_type == 'LSTM' else _GRUCore
+        self._recurrent_core = torch.jit.script(core_type(self._recurrent_layer))
+
         self._recurrent_parameters = [name for name, _ in self.named_parameters()]
 
+        self._warmup()
+
         return self
 
     def forward(self, inputs, lengths):
@@ -173,13 +305,13 @@ class UnidirectionalRNNEncoder(RNNEncoder):
             Variable, (num_layers * directions, batch_size, hidden_size) the final hidden state.
         """
         initial_state = self._init_hidden(inputs.size(0))
-        embedded_inputs = self.embedding(inputs)
-        padded_sequence = pack_padded_sequence(embedded_inputs, lengths=lengths, batch_first=True)
+        packed_inputs = self._pack_inputs(inputs, lengths)
+        embedded_data = self.embedding(packed_inputs.data)
 
-        self._recurrent_layer.flatten_parameters()
-
-        outputs, self._outputs['hidden_state'] = self._recurrent_layer(padded_sequence, initial_state)
-        self._outputs['encoder_outputs'], _ = pad_packed_sequence(outputs, batch_first=True)
+        self._outputs['encoder_outputs'], self._outputs['hidden_state'] = \
+            self._recurrent_core(embedded_data, packed_inputs.batch_sizes,
+                                 packed_inputs.sorted_indices,
+                                 packed_inputs.unsorted_indices, initial_state)
 
         return self._outputs
 
@@ -188,19 +320,14 @@ class UnidirectionalRNNEncoder(RNNEncoder):
         Initializes the hidden state of the encoder module.
 
         :return:
-            Variable, (num_layers*directions, batch_size, hidden_dim) with zeros as initial values.
+            Tensor, (num_layers*directions, batch_size, hidden_dim) with zeros as initial values.
         """
-        state = torch.randn(self._num_layers, batch_size, self._hidden_size)
-
-        if self._cuda:
-            state = state.cuda()
-
-        state = autograd.Variable(state)
+        state = self._hidden_state_slice(self._num_layers, batch_size)
 
         if isinstance(self._recurrent_layer, torch.nn.LSTM):
-            return state.contiguous(), state.contiguous()
+            return state, state
         else:
-            return state.contiguous()
+            return state
 
 
 class BidirectionalRNNEncoder(RNNEncoder):
@@ -227,6 +354,8 @@ class BidirectionalRNNEncoder(RNNEncoder):
         """
         self._parameter_setter.initialize(self)
 
+        self._device = torch.device('cuda' if self._cuda else 'cpu')
+
         if self._recurrent_type == 'LSTM':
             unit_type = torch.nn.LSTM
         elif self._recurrent_type == 'GRU':
@@ -252,8 +381,15 @@ class BidirectionalRNNEncoder(RNNEncoder):
         self._projection_layer = torch.nn.Parameter(projection_weights)
         self._hidden_projection_layer = torch.nn.Parameter(hidden_projection_weights)
 
+        self._recurrent_layer.flatten_parameters()
+
+        core_type = _LSTMCore if self._recurrent_type == 'LSTM' else _GRUCore
+        self._recurrent_core = torch.jit.script(core_type(self._recurrent_layer))
+
         self._recurrent_parameters = [name for name, _ in self.named_parameters()]
 
+        self._warmup()
+
         return self
 
     def forward(self, inputs, lengths):
@@ -275,13 +411,12 @@ class BidirectionalRNNEncoder(RNNEncoder):
             Variable, (num_layers * directions, batch_size, hidden_size) the final hidden state.
         """
         initial_state = self._init_hidden(inputs.size(0))
-        embedded_inputs = self.embedding(inputs)
-        padded_sequence = pack_padded_sequence(embedded_inputs, lengths=lengths, batch_first=True)
+        packed_inputs = self._pack_inputs(inputs, lengths)
+        embedded_data = self.embedding(packed_inputs.data)
 
-        self._recurrent_layer.flatten_parameters()
-
-        outputs, hidden_state = self._recurrent_layer(padded_sequence, initial_state)
-        outputs, _ = pad_packed_sequence(outputs, batch_first=True)
+        outputs, hidden_state = self._recurrent_core(embedded_data, packed_inputs.batch_sizes,
+                                                     packed_inputs.sorted_indices,
+                                                     packed_inputs.unsorted_indices, initial_state)
 
         self._outputs['encoder_outputs'] = torch.matmul(outputs, self._projection_layer)
         self._outputs['hidden_state'] = self._project_hidden_state(hidden_state)
@@ -293,41 +428,36 @@ class BidirectionalRNNEncoder(RNNEncoder):
         Initializes the hidden state of the encoder module.
 
         :return:
-            Variable, (num_layers*directions, batch_size, hidden_dim) with zeros as initial values.
+            Tensor, (num_layers*directions, batch_size, hidden_dim) with zeros as initial values.
         """
-        state = torch.randn(self._num_layers*2, batch_size, self._hidden_size)
-
-        if self._cuda:
-            state = state.cuda()
-
-        state = autograd.Variable(state)
+        state = self._hidden_state_slice(self._num_layers*2, batch_size)
 
         if isinstance(self._recurrent_layer, torch.nn.LSTM):
-            return state.contiguous(), state.contiguous()
+            return state, state
         else:
-            return state.contiguous()
+            return state
 
     def _project_hidden_state(self, hidden_state):
         """
+        Projects the (num_layers * 2, batch_size, hidden_size) hidden state of the
+        bidirectional layer down to num_layers states. The projection is expressed
+        as a single einsum contraction over the layer-direction axis, which avoids
+        the transpose round trips - and their contiguous copies - of an equivalent
+        matmul formulation.
 
         :param hidden_state:
+            Tensor or tuple of tensors, the final hidden state of the recurrent layer.
+
         :return:
+            Tensor or tuple of tensors, the projected hidden state.
         """
         if isinstance(hidden_state, tuple):
 
-            p_hs = torch.matmul(
-                hidden_state[0].transpose(0, 1).transpose(1, 2), self._hidden_projection_layer)\
-                .transpose(1, 2).transpose(0, 1)
-            p_cs = torch.matmul(
-                hidden_state[1].transpose(0, 1).transpose(1, 2), self._hidden_projection_layer)\
-                .transpose(1, 2).transpose(0, 1)
+            p_hs = torch.einsum('lbh,lk->kbh', hidden_state[0], self._hidden_projection_layer)
+            p_cs = torch.einsum('lbh,lk->kbh', hidden_state[1], self._hidden_projection_layer)
 
             return p_hs.contiguous(), p_cs.contiguous()
 
         else:
 
-            p_hs = torch.matmul(
-                hidden_state.transpose(0, 1).transpose(1, 2), self._hidden_projection_layer)\
-                .transpose(1, 2).transpose(0, 1)
-
-            return p_hs.contiguous()
+            return torch.einsum('lbh,lk->kbh', hidden_state, self._hidden_projection_layer).contiguous()
@@ -277,7 +277,8 @@ class Embedding(Module):
                  vocab_size:        int,
                  cuda:              bool,
                  weights:           torch.FloatTensor=None,
-                 requires_grad:     bool=True):
+                 requires_grad:     bool=True,
+                 padding_idx:       int=None):
         """
         An embedding instance.
 
@@ -295,14 +296,21 @@ class Embedding(Module):
 
         :param requires_grad:
 
+        :param padding_idx:
+            Int, id of the padding token, whose gradient row is kept zero.
+
         """
         super().__init__()
 
-        self._layer = torch.nn.Embedding(vocab_size, embedding_size)
         self._requires_grad = requires_grad
 
         if weights is not None:
-            self._layer.weight = torch.nn.Parameter(weights, requires_grad=self._requires_grad)
+            self._layer = torch.nn.Embedding.from_pretrained(weights,
+                                                             freeze=not requires_grad,
+                                                             padding_idx=padding_idx)
+        else:
+            self._layer = torch.nn.Embedding(vocab_size, embedding_size,
+                                             padding_idx=padding_idx)
 
         if cuda:
             self._layer = self._layer.cuda()
@@ -464,13 +472,14 @@ class Optimizer:
                  parameters,
                  optimizer_type,
                  scheduler_type,
-                 learning_rate):
+                 learning_rate,
+                 **kwargs):
         """
         Optimizer type object.
 
         :param parameters:
             Iterable, containing the parameters, that will be optimized by the provided
-            optimalization algorithm.
+            optimalization algorithm. Parameter group dictionaries are accepted as well.
 
         :param optimizer_type:
             Str, type of the algorithm to be used for optimalization.
@@ -480,10 +489,14 @@ class Optimizer:
 
         :param learning_rate:
             Float, the initial learning rate.
+
+        :param kwargs:
+            Additional keyword arguments for the optimalization algorithm, like the
+            foreach or fused implementation variants.
         """
         try:
 
-            self._algorithm = self._algorithms[optimizer_type](params=parameters, lr=learning_rate)
+            self._algorithm = self._algorithms[optimizer_type](params=parameters, lr=learning_rate, **kwargs)
             self._scheduler = self._schedulers[scheduler_type](self._algorithm)
 
         except KeyError as error:
@@ -498,8 +511,10 @@ class Optimizer:
     def clear(self):
         """
         Clears the gradients of the parameters, which are being optimized by the algorithm.
+        The gradients are set to None instead of zero-filled, which spares a memset over
+        the full gradient storage on every iteration.
         """
-        self._algorithm.zero_grad()
+        self._algorithm.zero_grad(set_to_none=True)
 
     def adjust(self, metric):
         """
@@ -286,6 +286,12 @@ class UnsupervisedTranslation(Experiment):
         self._model = model
         self._reguralizer = reguralizer
 
+        # Batch transfers are issued on a dedicated stream, so the copy of the
+        # next batch overlaps with the compute already queued on the default
+        # stream, instead of serializing behind it.
+
+        self._copy_stream = torch.cuda.Stream() if policy.cuda else None
+
         self.reguralize = False
 
         self._noise_model = NoiseModel(use_cuda=self._policy.cuda)
@@ -445,8 +451,8 @@ class UnsupervisedTranslation(Experiment):
                     by the PaddedSequence PyTorch utility.
         """
         formatted_batch = {
-            'inputs':           torch.from_numpy(batch[:, 1: -2]),
-            'targets':          torch.from_numpy(batch[:, : -1]),
+            'inputs':           batch[:, 1: -2],
+            'targets':          batch[:, : -1],
             'input_lengths':    batch[:, -1]
         }
 
@@ -458,7 +464,16 @@ class UnsupervisedTranslation(Experiment):
                 formatted_batch['input_lengths'] - 2
 
         if self._policy.cuda:
-            formatted_batch['targets'] = formatted_batch['targets'].cuda()
+            with torch.cuda.stream(self._copy_stream):
+                formatted_batch['targets'] = formatted_batch['targets'].cuda(non_blocking=True)
+
+            # The allocation is owned by the copy stream, so the tensor has to be
+            # marked as in use on the consuming stream as well - otherwise the
+            # caching allocator could hand its block to the next batch while the
+            # default stream is still reading it.
+
+            formatted_batch['targets'].record_stream(torch.cuda.current_stream())
+            torch.cuda.current_stream().wait_stream(self._copy_stream)
 
         formatted_batch['targets'] = torch.autograd.Variable(
             formatted_batch['targets'])
@@ -702,7 +717,7 @@ class UnsupervisedTranslation(Experiment):
             inputs = batch['inputs']
 
         if self._policy.cuda:
-            inputs = inputs.cuda()
+            inputs = inputs.pin_memory().cuda(non_blocking=True)
 
         inputs = torch.autograd.Variable(inputs)
 
@@ -740,7 +755,7 @@ class UnsupervisedTranslation(Experiment):
         shaped_inputs = torch.from_numpy(shaped_inputs).float()
 
         if self._policy.cuda:
-            shaped_inputs = shaped_inputs.cuda()
+            shaped_inputs = shaped_inputs.pin_memory().cuda(non_blocking=True)
 
         shaped_inputs = torch.autograd.Variable(shaped_inputs)
 
@@ -849,13 +864,17 @@ class DividedCurriculumTranslation(UnsupervisedTranslation):  # TODO
                         by the PaddedSequence PyTorch utility.
         """
         formatted_batch = {
-            'inputs':           torch.from_numpy(batch[:, 1: -2]),
-            'targets':          torch.from_numpy(batch[:, : -1]),
+            'inputs':           batch[:, 1: -2],
+            'targets':          batch[:, : -1],
             'input_lengths':    batch[:, -1] - 1
         }
 
         if self._policy.cuda:
-            formatted_batch['targets'] = formatted_batch['targets'].cuda()
+            with torch.cuda.stream(self._copy_stream):
+                formatted_batch['targets'] = formatted_batch['targets'].cuda(non_blocking=True)
+
+            formatted_batch['targets'].record_stream(torch.cuda.current_stream())
+            torch.cuda.current_stream().wait_stream(self._copy_stream)
 
         formatted_batch['targets'] = torch.autograd.Variable(formatted_batch['targets'])
 
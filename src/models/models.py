@@ -2,11 +2,15 @@
 
 """
 
+import torch
+
 from torch.nn import Module
 
 from src.components.base import Encoder
 from src.components.base import Decoder
 
+from src.components.utils.utils import Optimizer
+
 from src.utils.utils import Component, Interface
 
 
@@ -66,17 +70,66 @@ class SeqToSeq(Model):
         """
         super().__init__()
 
-        self.encoder = encoder.init_parameters().init_optimizer()
-        self.decoder = decoder.init_parameters().init_optimizer()
+        self.encoder = encoder.init_parameters()
+        self.decoder = decoder.init_parameters()
+
+        self._optimizer = Optimizer(
+            parameters=[
+                {'params': self.encoder.parameters(), 'lr': self.encoder.learning_rate},
+                {'params': self.decoder.parameters(), 'lr': self.decoder.learning_rate}
+            ],
+            optimizer_type=self.encoder.optimizer_type,
+            scheduler_type='ReduceLROnPlateau',
+            learning_rate=self.encoder.learning_rate,
+            foreach=True)
 
         self._parameter_names = [name for name, _ in self.named_parameters()]
 
+        self._outputs = {}
+
+        self._compiled_forward = torch.compile(self._forward_impl,
+                                               mode='reduce-overhead',
+                                               dynamic=True)
+
     def forward(self,
                 inputs,
                 lengths,
                 targets,
                 max_length):
         """
+        Forward step of the sequence to sequence model. The computation is
+        delegated to the compiled graph of the encode/decode chain, which fuses
+        the pointwise operations between the embedding lookup, the recurrent
+        layers and the output projection, and removes the per-step Python
+        dispatch overhead. dynamic=True keeps a single graph across the varying
+        batch and sequence shapes instead of recompiling per shape.
+
+        :param inputs:
+            Variable, containing the ids of the tokens for the input sequence.
+
+        :param targets:
+            Variable, containing the ids of the tokens for the target sequence.
+
+        :param max_length:
+            int, the maximum length of the decoded sequence.
+
+        :param lengths:
+            Ndarray, containing the lengths of the original sequences.
+
+        :return outputs:
+            dict, containing the concatenated outputs of the encoder and decoder.
+        """
+        return self._compiled_forward(inputs=inputs,
+                                      lengths=lengths,
+                                      targets=targets,
+                                      max_length=max_length)
+
+    def _forward_impl(self,
+                      inputs,
+                      lengths,
+                      targets,
+                      max_length):
+        """
         Forward step of the sequence to sequence model.
 
         :param inputs:
@@ -94,10 +147,56 @@ class SeqToSeq(Model):
         :return outputs:
             dict, containing the concatenated outputs of the encoder and decoder.
         """
-        encoder_outputs = self.encoder(inputs=inputs, lengths=lengths)
-        decoder_outputs, predictions = self.decoder(targets=targets, max_length=max_length, **encoder_outputs)
+        encoder_outputs = self.encode(inputs=inputs, lengths=lengths)
+        decoder_outputs, predictions = self.decode(targets=targets,
+                                                   max_length=max_length,
+                                                   encoder_outputs=encoder_outputs)
+
+        # The component outputs are merged into a persistent dictionary - the same
+        # pattern the encoder and decoder use for their own outputs - instead of
+        # allocating a fresh merged dictionary on every forward step.
 
-        return {**decoder_outputs, **encoder_outputs}, predictions
+        self._outputs.update(encoder_outputs)
+        self._outputs.update(decoder_outputs)
+
+        return self._outputs, predictions
+
+    def encode(self, inputs, lengths):
+        """
+        Propagates the inputs through the encoder. The produced outputs are the fixed
+        representation of the source batch, which may be cached by the caller, and reused
+        for any number of decoding passes, instead of re-running the encoder per pass.
+
+        :param inputs:
+            Variable, containing the ids of the tokens for the input sequence.
+
+        :param lengths:
+            Ndarray, containing the lengths of the original sequences.
+
+        :return encoder_outputs:
+            dict, containing the outputs and the final hidden state of the encoder.
+        """
+        return self.encoder(inputs=inputs, lengths=lengths)
+
+    def decode(self, targets, max_length, encoder_outputs):
+        """
+        Propagates the cached encoder outputs through the decoder. The encoder is not
+        invoked by this method, so repeated decoding of the same source batch only pays
+        for the decoder computations.
+
+        :param targets:
+            Variable, containing the ids of the tokens for the target sequence.
+
+        :param max_length:
+            int, the maximum length of the decoded sequence.
+
+        :param encoder_outputs:
+            dict, the cached result of a previous encode call.
+
+        :return decoder_outputs:
+            tuple, the outputs and predictions of the decoder.
+        """
+        return self.decoder(targets=targets, max_length=max_length, **encoder_outputs)
 
     def freeze(self):
         """
@@ -116,11 +215,12 @@ class SeqToSeq(Model):
     @property
     def optimizers(self):
         """
-        Convenience function for the optimizers of the encoder and decoder.
-        :return: dict, containing the names and instances of optimizers for the encoder/decoder
-                 and the currently used embeddings.
+        Convenience function for the optimizer of the model. The encoder and decoder
+        parameters are optimized by a single multi-tensor algorithm, that steps both
+        parameter groups in one fused pass.
+        :return: list, containing the single optimizer of the model.
         """
-        return [*self.encoder.optimizers, *self.decoder.optimizers]
+        return [self._optimizer]
 
     @property
     def output_size(self):
@@ -159,8 +259,9 @@ class SeqToSeq(Model):
 
         """
         return {
-            'encoder': self.encoder.state,
-            'decoder': self.decoder.state
+            'encoder':      self.encoder.state,
+            'decoder':      self.decoder.state,
+            'optimizer':    self._optimizer.state
         }
 
     @state.setter
@@ -170,3 +271,4 @@ class SeqToSeq(Model):
         """
         self.encoder.state = state['encoder']
         self.decoder.state = state['decoder']
+        self._optimizer.state = state['optimizer']
@@ -2,14 +2,14 @@
 
 """
 
-import copy
 import os
 import sys
 import tqdm
+import queue
 import logging
 import numpy
+import threading
 
-import sklearn.utils
 import torch
 import torch.nn
 
@@ -18,6 +18,11 @@ from src.components.utils.utils import Embedding
 from src.utils.utils import Component, ids_from_sentence, sentence_from_ids, subclasses, Interface
 
 
+# numpy.integer covers every numpy integer width with a single isinstance check.
+
+_ACCEPTED_ID_TYPES = (int, numpy.integer)
+
+
 class Vocabulary(Component):
     """
     Wrapper class for the lookup tables of the languages.
@@ -57,7 +62,7 @@ class Vocabulary(Component):
             bool, true if cuda support is available
         """
         self._word_to_id = {}
-        self._id_to_word = {}
+        self._id_to_word = []
         self._word_to_count = {}
 
         self._language_identifiers = language_identifiers
@@ -69,6 +74,7 @@ class Vocabulary(Component):
         self._vocab_size = None
         self._embedding_size = None
         self._embedding_weights = None
+        self._tokens = None
 
         self._load_data(path=vocab_path)
 
@@ -77,7 +83,8 @@ class Vocabulary(Component):
                                     vocab_size=self._vocab_size,
                                     cuda=self._cuda,
                                     weights=self._embedding_weights,
-                                    requires_grad=self.requires_grad)
+                                    requires_grad=self.requires_grad,
+                                    padding_idx=self._word_to_id['<PAD>'])
 
     def _load_data(self, path: str):
         """
@@ -93,38 +100,55 @@ class Vocabulary(Component):
             self._embedding_size = int(first_line[1])
 
             if self._provided:
-                self._embedding_weights = numpy.empty((self._vocab_size, self._embedding_size), dtype=float)
+                self._embedding_weights = numpy.empty((self._vocab_size, self._embedding_size),
+                                                      dtype=numpy.float32)
 
             for index, line in enumerate(file):
-                line_as_list = list(line.split(' '))
-                self._word_to_id[line_as_list[0]] = index
+                word, _, weights = line.partition(' ')
+                self._word_to_id[sys.intern(word)] = index
                 if self._provided:
-                    self._embedding_weights[index, :] = numpy.array([float(element) for element
-                                                                    in line_as_list[1:]], dtype=float)
+                    self._embedding_weights[index, :] = numpy.fromstring(weights, dtype=numpy.float32, sep=' ')
 
             for token in self._language_identifiers:
-                self._word_to_id[token] = len(self._word_to_id)
+                self._word_to_id[sys.intern(token)] = len(self._word_to_id)
 
             self._word_to_id['<SOS>'] = len(self._word_to_id)
             self._word_to_id['<EOS>'] = len(self._word_to_id)
             self._word_to_id['<UNK>'] = len(self._word_to_id)
             self._word_to_id['<PAD>'] = len(self._word_to_id)
 
-            self._id_to_word = dict(zip(self._word_to_id.values(), self._word_to_id.keys()))
+            self._tokens = {
+                '<SOS>': self._word_to_id['<SOS>'],
+                '<EOS>': self._word_to_id['<EOS>'],
+                '<UNK>': self._word_to_id['<UNK>'],
+                '<PAD>': self._word_to_id['<PAD>']
+            }
+
+            # The ids form a contiguous range by construction, so the reverse lookup
+            # is a list indexed by id, instead of a second vocab-sized hash table.
+
+            self._id_to_word = [None] * len(self._word_to_id)
+            for word, word_id in self._word_to_id.items():
+                self._id_to_word[word_id] = word
 
             if self._provided:
-                self._embedding_weights[-1, :] = numpy.zeros(self._embedding_size)
-                self._embedding_weights[-2, :] = numpy.zeros(self._embedding_size)
-                self._embedding_weights[-3, :] = numpy.zeros(self._embedding_size)
-                self._embedding_weights[-4, :] = numpy.zeros(self._embedding_size)
+                self._embedding_weights[-4:, :] = 0
+
+                # The language identifier rows are drawn at the word2vec scale of
+                # U[-1/(2d), 1/(2d)], so the fresh tokens match the magnitude of the
+                # pretrained rows instead of dominating them with values in [0, 1).
 
-                for index in range(-5, -5-len(self._language_identifiers), -1):
-                    self._embedding_weights[index, :] = numpy.random.rand(self._embedding_size)
+                num_identifiers = len(self._language_identifiers)
+                scale = 1.0 / (2 * self._embedding_size)
+                self._embedding_weights[-4-num_identifiers:-4, :] = numpy.random.uniform(
+                    -scale, scale,
+                    size=(num_identifiers, self._embedding_size)).astype(numpy.float32)
 
-                self._embedding_weights = torch.from_numpy(self._embedding_weights).float()
+                self._embedding_weights = torch.from_numpy(self._embedding_weights)
 
                 if self._cuda:
-                    self._embedding_weights = self._embedding_weights.cuda()
+                    self._embedding_weights = self._embedding_weights.pin_memory()\
+                        .to('cuda', non_blocking=True)
 
     def __call__(self, expression):
         """
@@ -137,12 +161,10 @@ class Vocabulary(Component):
         :return:
             int or str, (id or word) of the provided expression.
         """
-        _accepted_id_types = (int, numpy.int32, numpy.int64)
-
         if isinstance(expression, str):
             return self._word_to_id[expression]
 
-        elif type(expression) in _accepted_id_types:
+        elif isinstance(expression, _ACCEPTED_ID_TYPES):
             return self._id_to_word[expression]
 
         else:
@@ -156,12 +178,7 @@ class Vocabulary(Component):
         :return:
             dict, <UNK>, <EOS>, <PAD> and <SOS> tokens with their ids.
         """
-        return {
-            '<SOS>': self._word_to_id['<SOS>'],
-            '<EOS>': self._word_to_id['<EOS>'],
-            '<UNK>': self._word_to_id['<UNK>'],
-            '<PAD>': self._word_to_id['<PAD>']
-        }
+        return self._tokens
 
     @property
     def embedding(self):
@@ -319,10 +336,12 @@ class Monolingual(Corpora):
         :return:
             list, the data stored as a list of strings.
         """
-        data = []
+        # Reading the whole corpus and splitting in a single C-level call avoids
+        # the per-line iterator and append overhead of looping over the file.
+        # keepends retains the trailing newlines the loop-based loader produced.
+
         with open(data_path, 'r', encoding='utf-8') as file:
-            for line in file:
-                data.append(line)
+            data = file.read().splitlines(keepends=True)
         if len(data) == 0:
             raise ValueError('The given file is empty.')
         return data
@@ -481,13 +500,44 @@ class MemoryInput(InputPipeline):
         self._batch_size = batch_size
         self._max_segment_size = max_segment_size
 
+        # The generator is seeded from the global numpy RNG - set by the experiment
+        # seed at startup - so the shuffling order stays reproducible across runs,
+        # while each reader still draws a distinct stream.
+
+        self._rng = numpy.random.default_rng(numpy.random.randint(2 ** 32))
+
         padding_types = subclasses(Padding)
 
-        self._padder = padding_types[padding_type](self._corpora.vocabulary, max_segment_size)
+        self._padder = padding_types[padding_type](self._corpora.vocabulary, max_segment_size, cuda)
 
         self._corpora.initialize_corpus()
 
-        self._data = self._padder(self._corpora.data)
+        self._data = self._pack_data(self._padder(self._corpora.data))
+
+    def _pack_data(self, data):
+        """
+        Packs the padded rows into a single contiguous int32 matrix, padded to the
+        length of the longest sequence of the corpus, with the real length kept in
+        the last column. The segment and batch slicing downstream then operates on
+        zero-copy views of one allocation, instead of a list of per-row objects.
+
+        :param data:
+            list, the padded id rows of the corpus.
+
+        :return:
+            ndarray, (num_rows, max_length + 1) containing the packed corpus.
+        """
+        max_length = max(row[-1] for row in data)
+        pad_id = self._corpora.vocabulary.tokens['<PAD>']
+
+        packed = numpy.full((len(data), max_length + 1), pad_id, dtype=numpy.int32)
+
+        for index, row in enumerate(data):
+            length = row[-1]
+            packed[index, :length] = row[:length]
+            packed[index, -1] = length
+
+        return packed
 
     def batch_generator(self):
         """
@@ -504,7 +554,8 @@ class MemoryInput(InputPipeline):
         """
         for data_segment in self._segment_generator():
             if self._shuffle:
-                shuffled_data_segment = sklearn.utils.shuffle(data_segment)
+                order = self._rng.permutation(len(data_segment))
+                shuffled_data_segment = [data_segment[index] for index in order]
             else:
                 shuffled_data_segment = data_segment
             for index in range(0, len(shuffled_data_segment)-self._batch_size+1, self._batch_size):
@@ -532,10 +583,12 @@ class MemoryInput(InputPipeline):
 
     def _segment_generator(self):
         """
-        Divides the data to segments of size MAX_SEGMENT_SIZE.
+        Divides the data to segments of size MAX_SEGMENT_SIZE. The yielded segment is
+        a slice, that shares its rows with the stored data, which is safe, since the
+        padder does not mutate the rows while creating batches.
         """
         for index in range(0, len(self._data), self._max_segment_size):
-            yield copy.deepcopy(self._data[index:index + self._max_segment_size])
+            yield self._data[index:index + self._max_segment_size]
 
     @property
     def corpora(self):
@@ -606,6 +659,7 @@ class FileInput(InputPipeline):
         self._batch_size = batch_size
         self._shuffle = shuffle
         self._max_segment_size = max_segment_size
+        self._rng = numpy.random.default_rng(numpy.random.randint(2 ** 32))
 
         self._data_reader = DataQueue(corpora=self._corpora)
 
@@ -613,7 +667,7 @@ class FileInput(InputPipeline):
 
         self.total_length = self._measure_length()
 
-        self._padder = padding_types[padding_type](self._corpora.vocabulary, max_segment_size)
+        self._padder = padding_types[padding_type](self._corpora.vocabulary, max_segment_size, cuda)
 
     def batch_generator(self):
         """
@@ -630,7 +684,8 @@ class FileInput(InputPipeline):
         """
         for data_segment in self._segment_generator():
             if self._shuffle:
-                shuffled_data_segment = sklearn.utils.shuffle(data_segment)
+                order = self._rng.permutation(len(data_segment))
+                shuffled_data_segment = [data_segment[index] for index in order]
             else:
                 shuffled_data_segment = data_segment
             for index in range(0, len(shuffled_data_segment)-self._batch_size+1, self._batch_size):
@@ -656,7 +711,7 @@ class FileInput(InputPipeline):
         """
         for file_data_segment in self._data_reader.generator():
             for index in range(0, len(file_data_segment), self._max_segment_size):
-                yield copy.deepcopy(file_data_segment[index:index + self._max_segment_size])
+                yield file_data_segment[index:index + self._max_segment_size]
 
     @property
     def corpora(self):
@@ -730,120 +785,171 @@ class DataQueue:
 
     def _generate_id_file(self):
         """
-        Generates an ID representation of the provided text corpora.
+        Generates an ID representation of the provided text corpora. The converted
+        lines are collected into chunks, and written with a single call per chunk,
+        which keeps the number of write calls independent of the corpus length.
         """
+        flush_interval = 4096
+
         with tqdm.tqdm() as p_bar:
             p_bar.set_description(f'Creating {self._id_data_path}')
             with open(self._data_path, 'r', encoding='utf-8') as text_file:
-                with open(self._id_data_path, 'w', encoding='utf-8') as id_file:
+                with open(self._id_data_path, 'w', encoding='utf-8', buffering=1 << 20) as id_file:
+                    line_buffer = []
                     for line in text_file:
                         p_bar.update()
                         ids = ids_from_sentence(self._corpora.vocabulary, line)
-                        id_file.write('%s %d\n' % (' '.join(list(map(str, ids))), len(ids)))
+                        line_buffer.append('%s %d\n' % (' '.join(map(str, ids)), len(ids)))
+                        if len(line_buffer) == flush_interval:
+                            id_file.write(''.join(line_buffer))
+                            del line_buffer[:]
+                    if line_buffer:
+                        id_file.write(''.join(line_buffer))
 
     def generator(self) -> list:
         """
         Data is retrieved directly from a file, and loaded into data chunks of size MAX_CHUNK_SIZE.
-        """
-        with open(self._id_data_path, 'r') as file:
-            data_segment = []
-            for line in file:
-                if len(data_segment) < self._max_segment_size:
-                    data_segment.append(list(map(int, line.strip().split())))
-                else:
-                    temp_data_segment = copy.deepcopy(data_segment)
-                    del data_segment[:]
-                    yield temp_data_segment
-            yield data_segment
+        The segments are read and parsed by a background thread, that stays at most two segments
+        ahead of the consumer, so the next segment is prepared while the current one is being
+        trained on. Closing the generator stops the producer thread as well, since the training
+        loops regularly abandon the generator mid-epoch, when the parallel pipelines they are
+        zipped with run out first.
+        """
+        segment_queue = queue.Queue(maxsize=2)
+        stop_event = threading.Event()
+
+        def put_segment(segment):
+            while not stop_event.is_set():
+                try:
+                    segment_queue.put(segment, timeout=1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce_segments():
+            with open(self._id_data_path, 'r') as file:
+                data_segment = []
+                for line in file:
+                    if stop_event.is_set():
+                        return
+                    data_segment.append(numpy.fromstring(line, dtype=numpy.int32, sep=' '))
+                    if len(data_segment) == self._max_segment_size:
+                        if not put_segment(data_segment):
+                            return
+                        data_segment = []
+                if not put_segment(data_segment):
+                    return
+            put_segment(None)
+
+        producer = threading.Thread(target=produce_segments, daemon=True)
+        producer.start()
+
+        try:
+            while True:
+                data_segment = segment_queue.get()
+                if data_segment is None:
+                    break
+                yield data_segment
+        finally:
+
+            # The queue is drained after signaling the stop, so a producer that is
+            # blocked on a full queue wakes up, notices the event and exits, instead
+            # of leaking a thread and its buffered segments on every abandonment.
+
+            stop_event.set()
+            while True:
+                try:
+                    segment_queue.get_nowait()
+                except queue.Empty:
+                    break
+            producer.join()
 
 
-class ParallelDataQueue:  # TODO
+class Padding:
     """
-    A queue object for the data feed. This can be later configured to load the data to
-    memory asynchronously.
+    Base class for the padding types.
     """
-    MAX_SEGMENT = 50000
 
-    @staticmethod
-    def _location_scheme(path):
-        file_name = os.path.splitext(os.path.basename(path))
-        return os.path.join(os.path.dirname(os.path.realpath(path)),
-                            '%s_id%s' % (file_name[0], ''.join(file_name[1:])))
+    abstract = True
 
-    def __init__(self,
-                 corpora:           Corpora,
-                 max_segment_size:  int = MAX_SEGMENT):
+    def __init__(self, vocabulary: Vocabulary, max_segment_size: int, cuda: bool = False):
         """
-        A parallel data queue instance.
+        A padding type object.
 
-        :param corpora:
-            Corpora, the instance that will be provided with data.
+        :param vocabulary:
+            Vocabulary, that will be used for the ID conversion.
 
         :param max_segment_size:
-            int, size of a data segment.
+            int, size of the segment, that will be padded to the same length.
 
+        :param cuda:
+            bool, True if the created batches should be pinned for a device copy.
         """
-        self._data_path = corpora.data_path
-        self._id_data_path = self._location_scheme(corpora.data_path)
-
-        self._corpora = corpora
+        self._vocabulary = vocabulary
         self._max_segment_size = max_segment_size
-        self._data_segment_queue = []
+        self._cuda = cuda
+        self._pad_id = vocabulary.tokens['<PAD>']
 
-        if os.path.isfile(self._id_data_path):
-            logging.info(f'Using {self._id_data_path} as data source')
-        else:
-            logging.info(f'Creating {self._id_data_path} as data source')
-            self._generate_id_file()
+        self._pinned_buffers = [None, None]
+        self._buffer_events = [None, None]
+        self._buffer_index = 0
 
-    def _generate_id_file(self):
-        """
-        Generates an ID representation of the provided text corpora.
-        """
-        with open(self._data_path, 'r', encoding='utf-8') as text_file:
-            with open(self._id_data_path, 'w', encoding='utf-8') as id_file:
-                for line in text_file:
-                    ids = ids_from_sentence(self._corpora.vocabulary, line)
-                    id_file.write('%s %d\n' % (' '.join(list(map(str, ids))), len(ids)))
+    def create_batch(self, data):
+        raise NotImplementedError
 
-    def generator(self) -> list:
+    def _stage_batch(self, batch):
         """
-        Data is retrieved directly from a file, and loaded into data chunks of size MAX_CHUNK_SIZE.
+        Copies the batch into one of two reusable pinned staging buffers. Pinning
+        is a page-locking system call, so allocating a fresh pinned tensor per
+        batch would put it on the hot path; the two buffers are grown on demand
+        and alternated, which keeps the previously yielded batch valid while the
+        next one is written and its device copy is in flight. Cuda events fence
+        the in-flight copies, so a buffer is never overwritten before the device
+        has finished reading it.
+
+        :param batch:
+            Tensor, the assembled batch of ids.
+
+        :return:
+            Tensor, a pinned view of the staged batch, or the batch itself
+            without cuda.
         """
-        with open(self._id_data_path, 'r') as file:
-            data_segment = []
-            for line in file:
-                if len(data_segment) < self._max_segment_size:
-                    data_segment.append(list(map(int, line.strip().split())))
-                else:
-                    temp_data_segment = copy.deepcopy(data_segment)
-                    del data_segment[:]
-                    yield temp_data_segment
-            yield data_segment
+        if not self._cuda:
+            return batch
 
+        rows, columns = batch.size()
+        index = self._buffer_index
+        other = 1 - index
 
-class Padding:
-    """
-    Base class for the padding types.
-    """
+        # By the time a new batch is staged, the consumer has already issued the
+        # device copy out of the previously handed out buffer, so an event recorded
+        # on the current stream here fences that copy. Waiting for the event that
+        # was recorded one call earlier therefore guarantees the copy out of the
+        # buffer about to be reused has completed before it is rewritten.
 
-    abstract = True
+        if self._pinned_buffers[other] is not None:
+            if self._buffer_events[other] is None:
+                self._buffer_events[other] = torch.cuda.Event()
+            self._buffer_events[other].record()
 
-    def __init__(self, vocabulary: Vocabulary, max_segment_size: int):
-        """
-        A padding type object.
+        if self._buffer_events[index] is not None:
+            self._buffer_events[index].synchronize()
 
-        :param vocabulary:
-            Vocabulary, that will be used for the ID conversion.
+        buffer = self._pinned_buffers[index]
 
-        :param max_segment_size:
-            int, size of the segment, that will be padded to the same length.
-        """
-        self._vocabulary = vocabulary
-        self._max_segment_size = max_segment_size
+        if buffer is None or buffer.size(0) < rows or buffer.size(1) < columns:
+            buffer = torch.empty(max(rows, buffer.size(0) if buffer is not None else 0),
+                                 max(columns, buffer.size(1) if buffer is not None else 0),
+                                 dtype=torch.int64, pin_memory=True)
+            self._pinned_buffers[self._buffer_index] = buffer
 
-    def create_batch(self, data):
-        raise NotImplementedError
+        self._buffer_index = 1 - self._buffer_index
+
+        staged = buffer[:rows, :columns]
+        staged.copy_(batch)
+
+        return staged
 
 
 class PostPadding(Padding):
@@ -854,7 +960,7 @@ class PostPadding(Padding):
 
     abstract = False
 
-    def __init__(self, vocabulary: Vocabulary, max_segment_size: int):
+    def __init__(self, vocabulary: Vocabulary, max_segment_size: int, cuda: bool = False):
         """
         An instance of a post-padder object.
 
@@ -863,8 +969,11 @@ class PostPadding(Padding):
 
         :param max_segment_size:
             int, size of the segment, that will be padded to the same length.
+
+        :param cuda:
+            bool, True if the created batches should be pinned for a device copy.
         """
-        super().__init__(vocabulary, max_segment_size)
+        super().__init__(vocabulary, max_segment_size, cuda)
 
     def __call__(self, data: list) -> list:
         """
@@ -884,24 +993,32 @@ class PostPadding(Padding):
                 data_to_ids.append(ids)
         return data_to_ids
 
-    def create_batch(self, data: list) -> numpy.ndarray:
+    def create_batch(self, data: list) -> torch.Tensor:
         """
         Creates a sorted batch from the data. Each line of the data is padded to the
-        length of the longest sequence in the batch.
+        length of the longest sequence in the batch. The batch is returned as an
+        int64 tensor - pinned in case of cuda - so the downstream device copy can
+        run asynchronously without a staging hop through pageable memory.
 
         :param data:
             list, of IDs.
 
         :return:
-            ndarray, the padded list of ids.
+            Tensor, the padded batch of ids.
         """
-        sorted_data = sorted(data, key=lambda x: x[-1], reverse=True)
-        batch_length = sorted_data[0][-1]
-        for index in range(len(sorted_data)):
-            while len(sorted_data[index]) - 1 < batch_length:
-                sorted_data[index].insert(-1, self._vocabulary.tokens['<PAD>'])
+        lengths = numpy.fromiter((row[-1] for row in data), dtype=numpy.int64, count=len(data))
+        order = numpy.argsort(-lengths, kind='stable')
+        batch_length = lengths[order[0]]
 
-        return numpy.array(sorted_data, dtype='int')
+        batch = numpy.full((len(data), batch_length + 1),
+                           self._pad_id, dtype='int')
+
+        for index, data_index in enumerate(order):
+            length = lengths[data_index]
+            batch[index, :length] = data[data_index][:length]
+            batch[index, -1] = length
+
+        return self._stage_batch(torch.from_numpy(batch))
 
 
 class PrePadding(Padding):
@@ -912,7 +1029,7 @@ class PrePadding(Padding):
 
     abstract = False
 
-    def create_batch(self, data: list) -> numpy.ndarray:
+    def create_batch(self, data: list) -> torch.Tensor:
         """
         Creates a sorted batch from the data. Each line of the data is padded to the
         length of the longest sequence in the batch.
@@ -921,11 +1038,14 @@ class PrePadding(Padding):
             list, of IDs.
 
         :return:
-            ndarray, the padded list of ids.
+            Tensor, the padded batch of ids.
         """
-        return numpy.array(sorted(data, key=lambda x: x[-1], reverse=True))
+        batch = torch.as_tensor(numpy.array(sorted(data, key=lambda x: x[-1], reverse=True)),
+                                dtype=torch.int64)
+
+        return self._stage_batch(batch)
 
-    def __init__(self, vocabulary: Vocabulary, max_segment_size: int):
+    def __init__(self, vocabulary: Vocabulary, max_segment_size: int, cuda: bool = False):
         """
         An instance of a pre-padder object.
 
@@ -934,8 +1054,11 @@ class PrePadding(Padding):
 
        :param  max_segment_size:
             int, size of the segment, that will be padded to the same length.
+
+        :param cuda:
+            bool, True if the created batches should be pinned for a device copy.
         """
-        super().__init__(vocabulary, max_segment_size)
+        super().__init__(vocabulary, max_segment_size, cuda)
 
     def __call__(self, data: list) -> list:
         """
@@ -951,16 +1074,19 @@ class PrePadding(Padding):
         """
         data_to_ids = []
         for index in range(0, len(data), self._max_segment_size):
-            segment_length = len(ids_from_sentence(
-                self._vocabulary,
-                data[index:index + self._max_segment_size][0]))
-            for line in data[index:index + self._max_segment_size]:
-                ids = ids_from_sentence(self._vocabulary, line)
+
+            # Each line is converted exactly once, and the segment is padded to
+            # its longest member, instead of assuming that the first line of the
+            # segment is the longest.
+
+            segment_ids = [ids_from_sentence(self._vocabulary, line)
+                           for line in data[index:index + self._max_segment_size]]
+            segment_length = max(len(ids) for ids in segment_ids)
+            for ids in segment_ids:
                 ids_len = len(ids)
-                while len(ids) < segment_length:
-                    ids.append(self._vocabulary.tokens['<PAD>'])
-                data_line = numpy.zeros((segment_length + 1), dtype='int')
-                data_line[:-1] = ids
+                data_line = numpy.full((segment_length + 1),
+                                       self._pad_id, dtype='int')
+                data_line[:ids_len] = ids
                 data_line[-1] = ids_len
                 data_to_ids.append(data_line)
 
@@ -1,10 +1,14 @@
-from functools import wraps
+from functools import lru_cache, wraps
 
+import contextlib
 import time
 import pickle
 import os.path
 import inspect
 
+import torch
+import torch.distributed
+
 from collections import OrderedDict
 
 
@@ -17,15 +21,31 @@ class Component:
 
     abstract = True
 
+    _property_names = {}
+
     def properties(self):
         """
         Convenience function for retrieving the properties of an instances, with their values.
+        The inspect scan over the class members only runs once per class, its result is
+        memoized, since the set of properties of a type never changes at runtime.
         """
-        return {
-            name: getattr(self, name) for (name, _) in
-            inspect.getmembers(type(self), lambda x: isinstance(x, property))
-            if name != 'optimizers' and name != 'state'
-        }
+        names = Component._property_names.get(type(self))
+
+        if names is None:
+
+            # The excluded properties only become readable after init_parameters()
+            # has run, while properties() is already called during config assembly,
+            # right after construction.
+
+            excluded = ('optimizers', 'state', 'optimizer_type', 'learning_rate')
+            names = tuple(
+                name for (name, _) in
+                inspect.getmembers(type(self), lambda x: isinstance(x, property))
+                if name not in excluded
+            )
+            Component._property_names[type(self)] = names
+
+        return {name: getattr(self, name) for name in names}
 
 
 class Interface:
@@ -67,6 +87,15 @@ class ModelWrapper:
         self._model = model
         self._tokens = tokens
 
+        if torch.distributed.is_available() and torch.distributed.is_initialized():
+            device_ids = [torch.cuda.current_device()] if torch.cuda.is_available() else None
+            self._wrapped_model = torch.nn.parallel.DistributedDataParallel(
+                model,
+                device_ids=device_ids,
+                gradient_as_bucket_view=True)
+        else:
+            self._wrapped_model = model
+
         self._table = {
             'encoder':          None,
             'encoder_inputs':   None,
@@ -77,9 +106,26 @@ class ModelWrapper:
 
     def __call__(self, *args, **kwargs):
         """
-        Forwards the call to the actual model.
+        Forwards the call to the actual model. In a distributed setting the call goes
+        through the DistributedDataParallel wrapper, so the backward pass overlaps the
+        gradient all-reduce with the computation.
         """
-        return self._model(*args, **kwargs)
+        return self._wrapped_model(*args, **kwargs)
+
+    def gradient_sync(self, synchronize=True):
+        """
+        Context manager, that controls the gradient synchronization of the distributed
+        model. Micro-batches of a gradient accumulation window should run forward and
+        backward with synchronize=False, so the all-reduce is only payed for on the
+        accumulation boundary. Outside of a distributed session the context is a no-op.
+
+        :param synchronize:
+            bool, False if the gradients of this iteration should stay local.
+        """
+        if not synchronize and isinstance(self._wrapped_model, torch.nn.parallel.DistributedDataParallel):
+            return self._wrapped_model.no_sync()
+
+        return contextlib.nullcontext()
 
     def init_table(self, lookups):
         self._table['encoder_inputs'] = lookups['encoder_inputs']
@@ -322,6 +368,20 @@ def format_outputs(inputs, targets, outputs):
                                                                      '\t'.join(output_sentence))
 
 
+@lru_cache(maxsize=1 << 18)
+def _word_id_from_cache(vocabulary, word):
+    """
+    Memoized per-token id lookup. Token distributions are Zipfian, so the cache
+    hit rate is high, and a hit replaces the vocabulary call with a C-level
+    cache lookup. The vocabulary participates in the key by identity, which
+    keeps the ids of the different languages apart.
+    :param vocabulary: Language, object of the language to use the look up of.
+    :param word: string, a single token.
+    :return: int, id of the token.
+    """
+    return vocabulary(word)
+
+
 def ids_from_sentence(vocabulary, sentence):
     """
     Convenience method, for converting a sequence of words to ids.
@@ -329,7 +389,7 @@ def ids_from_sentence(vocabulary, sentence):
     :param sentence: string, a tokenized sequence of words.
     :return: list, containing the ids (int) of the sentence in the same order.
     """
-    return [vocabulary(word.rstrip()) for word in sentence.strip().split() if word.rstrip() != '']
+    return [_word_id_from_cache(vocabulary, word) for word in sentence.strip().split()]
 
 
 def sentence_from_ids(vocabulary, ids):